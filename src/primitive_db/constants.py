@@ -1,5 +1,8 @@
 METADATA_PATH = "data/db_meta.json"
 SUPPORTED_TYPES = {"int", "str", "bool"}
+INT_MIN = -(2**63)
+INT_MAX = 2**63 - 1
 RESERVED_ID_COLUMN = "ID"
 DATA_DIR = "data"
-TABLE_FILE_TEMPLATE = "data/{table}.json"
+TABLE_FILE_TEMPLATE = "data/{table}.jsonl"
+LEGACY_TABLE_FILE_TEMPLATE = "data/{table}.json"
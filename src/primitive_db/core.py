@@ -1,17 +1,25 @@
-from dataclasses import dataclass
+from collections.abc import Callable, Iterator
+from functools import lru_cache
+from itertools import compress, repeat
+from operator import call, eq, itemgetter
 
-from .constants import RESERVED_ID_COLUMN, SUPPORTED_TYPES
+from .constants import INT_MAX, INT_MIN, RESERVED_ID_COLUMN, SUPPORTED_TYPES
 from .decorators import confirm_action, handle_db_errors, log_time
+from .indexes import get_index, move_rows
 
 
-@dataclass(frozen=True)
 class InvalidValueError(ValueError):
     """
     Недопустимое значение, введенное пользователем
 
     :param value: недопустимое значение
     """
-    value: str
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: str):
+        super().__init__(value)
+        self.value = value
 
 
 class TableAlreadyExistsError(KeyError):
@@ -32,6 +40,15 @@ class TableSchemaError(ValueError):
     """
 
 
+_VALIDATORS = {
+    "int": lambda v: (
+        isinstance(v, int) and not isinstance(v, bool) and INT_MIN <= v <= INT_MAX
+    ),
+    "bool": lambda v: isinstance(v, bool),
+    "str": lambda v: isinstance(v, str),
+}
+
+
 def _get_schema(metadata: dict, table_name: str) -> list:
     """
     Получение схемы таблицы из метаданных
@@ -61,22 +78,226 @@ def _validate_value(col_type: str, value: object) -> object:
     :return: object: Валидное значение
     :raises: InvalidValueError: Если значение не соответствует типу
     """
-    if col_type == "int":
-        if isinstance(value, bool) or not isinstance(value, int):
-            raise InvalidValueError(str(value))
-        return value
+    validator = _VALIDATORS.get(col_type)
+    if validator is None:
+        raise InvalidValueError(col_type)
+
+    if not validator(value):
+        raise InvalidValueError(str(value))
+
+    return value
+
+
+@lru_cache(maxsize=128)
+def _row_validator(types: tuple) -> Callable:
+    """
+    Сборка проверки набора значений для заданных типов колонок
+
+    Валидаторы выбираются по типам один раз и кэшируются по кортежу
+    типов схемы, поэтому при вставке не нужен поиск в _VALIDATORS
+    для каждого значения: все значения строки проверяются одним
+    вызовом all(map(...)). Если проверка не прошла, значения
+    проверяются по одному через _validate_value, чтобы ошибка
+    указывала на первое недопустимое значение.
+
+    :param types: Кортеж типов колонок (int/str/bool)
+    :return: Callable: validate_row(values) -> list
+    """
+    validators = tuple(map(_VALIDATORS.get, types))
+    known = None not in validators
+
+    def validate_row(values: list) -> list:
+        if known and all(map(call, validators, values)):
+            return list(values)
+        return [
+            _validate_value(col_type, value)
+            for col_type, value in zip(types, values, strict=True)
+        ]
+
+    return validate_row
+
+
+def format_columns(schema: list) -> str:
+    """
+    Текстовое описание колонок таблицы
+
+    :param schema: Схема таблицы (список колонок)
+    :return: str: Колонки в формате 'name:type, ...'
+    """
+    return ", ".join([f'{c["name"]}:{c["type"]}' for c in schema])
+
 
-    if col_type == "bool":
-        if not isinstance(value, bool):
-            raise InvalidValueError(str(value))
-        return value
+def _row_count(table_data: dict) -> int:
+    """
+    Количество записей в таблице
 
-    if col_type == "str":
-        if not isinstance(value, str):
-            raise InvalidValueError(str(value))
-        return value
+    :param table_data: Данные таблицы (словарь колонок)
+    :return: int: Количество записей
+    """
+    return len(table_data.get(RESERVED_ID_COLUMN, []))
 
-    raise InvalidValueError(col_type)
+
+def _materialize(table_data: dict, index: int) -> dict:
+    """
+    Сборка записи из колонок по номеру строки
+
+    :param table_data: Данные таблицы (словарь колонок)
+    :param index: Номер строки
+    :return: dict: Запись {колонка: значение}
+    """
+    return {name: column[index] for name, column in table_data.items()}
+
+
+def _materialize_rows(table_data: dict, idx: list) -> Iterator[dict]:
+    """
+    Ленивая сборка записей из колонок по списку номеров строк
+
+    Значения каждой колонки выбираются одним вызовом itemgetter,
+    затем колонки склеиваются в записи через zip. Словари записей
+    создаются по одному по мере чтения результата.
+
+    :param table_data: Данные таблицы (словарь колонок)
+    :param idx: Номера строк
+    :return: Iterator[dict]: Записи
+    """
+    if len(idx) < 2:
+        return (_materialize(table_data, i) for i in idx)
+
+    names = list(table_data)
+    get = itemgetter(*idx)
+    return (dict(zip(names, values)) for values in zip(*map(get, table_data.values())))
+
+
+def _column_values(
+    table_data: dict, names: list, idx: list | None = None
+) -> Iterator[tuple]:
+    """
+    Ленивая выборка значений колонок построчно, без сборки словарей
+
+    :param table_data: Данные таблицы (словарь колонок)
+    :param names: Имена колонок в порядке вывода
+    :param idx: Номера строк (None - все строки)
+    :return: Iterator[tuple]: Значения колонок names для каждой строки
+    """
+    columns = [table_data[name] for name in names]
+    if idx is None:
+        return zip(*columns)
+    if len(idx) < 2:
+        return (tuple(column[i] for column in columns) for i in idx)
+
+    get = itemgetter(*idx)
+    return zip(*map(get, columns))
+
+
+def _match_indices(column: list, value: object) -> list:
+    """
+    Номера строк, в которых значение колонки равно value
+
+    Маска сравнений строится через map/compress без Python-цикла по строкам.
+
+    :param column: Значения колонки
+    :param value: Искомое значение
+    :return: list: Номера подходящих строк
+    """
+    return list(compress(range(len(column)), map(eq, column, repeat(value))))
+
+
+def _find_rows(
+    table_data: dict, key: str, value: object, indexes: dict | None = None
+) -> list:
+    """
+    Номера строк, в которых table_data[key] == value
+
+    Если переданы индексы таблицы, используется хеш-индекс колонки
+    (он строится при первом поиске по ней), иначе полный просмотр.
+
+    :param table_data: Данные таблицы (словарь колонок)
+    :param key: Название колонки
+    :param value: Искомое значение
+    :param indexes: Индексы таблицы {колонка: {значение: [номера строк]}}
+    :return: list: Номера подходящих строк (по возрастанию)
+    """
+    if indexes is not None:
+        index = get_index(indexes, table_data, key)
+        if index is not None:
+            return list(index.get(value, ()))
+    return _match_indices(table_data.get(key, []), value)
+
+
+def _selectivity(condition: tuple, table_data: dict, indexes: dict) -> float:
+    """
+    Оценка числа строк, подходящих под условие (колонка, тип, значение)
+
+    :param condition: Условие (колонка, тип значения, значение)
+    :param table_data: Данные таблицы (словарь колонок)
+    :param indexes: Индексы таблицы
+    :return: float: Размер списка строк в индексе или inf, если колонки нет
+    """
+    key, _, value = condition
+    index = get_index(indexes, table_data, key)
+    if index is None:
+        return float("inf")
+    return len(index.get(value, ()))
+
+
+@lru_cache(maxsize=128)
+def _compile_predicate(conditions: tuple) -> Callable:
+    """
+    Сборка функции поиска строк для конъюнкции условий col = value
+
+    Условия связываются в замыкании один раз; результат кэшируется,
+    поэтому повторяющиеся where не собираются заново. Тип значения
+    входит в ключ кэша, чтобы 1 и True не смешивались.
+
+    Инвариант порядка: условия проверяются от самого селективного
+    (самый короткий список строк в индексе) к наименее селективному,
+    отсутствующие в таблице колонки идут последними. Первое условие дает
+    кандидатов, остальные только отсеивают их, поэтому проверка
+    прекращается, как только кандидатов не осталось.
+
+    :param conditions: Кортеж условий (колонка, тип значения, значение)
+    :return: Callable: find_rows(table_data, indexes=None) -> list
+    """
+
+    def find_rows(table_data: dict, indexes: dict | None = None) -> list:
+        ordered = conditions
+        if len(conditions) > 1 and indexes is not None:
+            ordered = sorted(
+                conditions, key=lambda c: _selectivity(c, table_data, indexes)
+            )
+
+        (key, _, value), *rest = ordered
+        idx = _find_rows(table_data, key, value, indexes)
+
+        for key, _, value in rest:
+            if not idx:
+                break
+            column = table_data.get(key)
+            if column is None:
+                return []
+            values = map(column.__getitem__, idx)
+            idx = list(compress(idx, map(eq, values, repeat(value))))
+
+        return idx
+
+    return find_rows
+
+
+def _where_predicate(where_clause: dict) -> Callable:
+    """
+    Проверка where-условия и получение функции поиска строк для него
+
+    :param where_clause: Условие where {колонка: значение} (все условия через AND)
+    :return: Callable: find_rows(table_data, indexes=None) -> list
+    :raises: InvalidValueError: Если where некорректен
+    """
+    if not isinstance(where_clause, dict) or not where_clause:
+        raise InvalidValueError("<where>")
+
+    conditions = tuple(
+        (key, type(value), value) for key, value in where_clause.items()
+    )
+    return _compile_predicate(conditions)
 
 
 def _parse_column_type(column_token: str) -> tuple:
@@ -144,7 +365,7 @@ def create_table(metadata: dict, table_name: str, columns: list) -> dict:
         parsed_columns.append({"name": column_name, "type": column_type})
 
     new_metadata = dict(metadata)
-    new_metadata[table_name] = {"columns": parsed_columns}
+    new_metadata[table_name] = {"columns": parsed_columns, "next_id": 1}
 
     return new_metadata
 
@@ -183,80 +404,184 @@ def list_tables(metadata: dict) -> list:
     return sorted(metadata.keys())
 
 
+def _insert_rows(
+    metadata: dict,
+    table_name: str,
+    table_data: dict,
+    values_list: list,
+    indexes: dict | None = None,
+) -> tuple:
+    """
+    Добавление пачки записей в таблицу
+
+    Схема читается один раз, все значения проверяются до изменения
+    данных (пачка добавляется целиком или не добавляется вовсе),
+    а ID выделяются одним диапазоном из счетчика next_id.
+
+    :param metadata: Метаданные бд
+    :param table_name: Название таблицы
+    :param table_data: Данные таблицы (словарь колонок)
+    :param values_list: Список наборов значений (без ID)
+    :param indexes: Индексы таблицы, обновляются на месте (опционально)
+    :return: tuple: (Обновленные данные, список новых ID)
+    :raises: TableDoesNotExistError: Если таблицы не существует
+    :raises: InvalidValueError: Если количество значений или типы некорректны
+    """
+    schema = _get_schema(metadata, table_name)
+    value_defs = schema[1:]
+    validate_row = _row_validator(tuple(c["type"] for c in value_defs))
+
+    rows = []
+    for values in values_list:
+        if len(values) != len(value_defs):
+            raise InvalidValueError(f"values_count={len(values)}")
+        rows.append(validate_row(values))
+
+    if not rows:
+        return table_data, []
+
+    table_meta = metadata[table_name]
+    start_id = table_meta.get("next_id")
+    if not isinstance(start_id, int):
+        existing_ids = [
+            row_id
+            for row_id in table_data[RESERVED_ID_COLUMN]
+            if isinstance(row_id, int)
+        ]
+        start_id = max(existing_ids, default=0) + 1
+
+    # Строка могла попасть в файл без сохранения next_id (сбой между
+    # записями), поэтому ID не должен быть меньше последнего в данных.
+    ids = table_data[RESERVED_ID_COLUMN]
+    if ids and isinstance(ids[-1], int):
+        start_id = max(start_id, ids[-1] + 1)
+
+    new_ids = list(range(start_id, start_id + len(rows)))
+    columns = [new_ids, *map(list, zip(*rows))]
+
+    row_pos = _row_count(table_data)
+    for col_def, column_values in zip(schema, columns, strict=True):
+        name = col_def["name"]
+        table_data[name].extend(column_values)
+        if indexes is not None and name in indexes:
+            index = indexes[name]
+            for offset, value in enumerate(column_values):
+                index.setdefault(value, []).append(row_pos + offset)
+
+    table_meta["next_id"] = start_id + len(rows)
+
+    return table_data, new_ids
+
+
 @handle_db_errors
 @log_time
-def insert(metadata: dict, table_name: str, table_data: list, values: list) -> tuple:
+def insert(
+    metadata: dict,
+    table_name: str,
+    table_data: dict,
+    values: list,
+    indexes: dict | None = None,
+) -> tuple:
     """
     Добавление записи в таблицу
+    Счетчик следующего ID (next_id) обновляется в метаданных на месте
 
     :param metadata: Метаданные бд
     :param table_name: Название таблицы
-    :param table_data: Данные таблицы
+    :param table_data: Данные таблицы (словарь колонок)
     :param values: Значения (без ID)
+    :param indexes: Индексы таблицы, обновляются на месте (опционально)
     :return: tuple: (Обновленные данные, новый ID)
     :raises: TableDoesNotExistError: Если таблицы не существует
     :raises: InvalidValueError: Если количество значений или типы некорректны
     """
-    schema = _get_schema(metadata, table_name)
-
-    expected = len(schema) - 1
-    if len(values) != expected:
-        raise InvalidValueError(f"values_count={len(values)}")
+    table_data, new_ids = _insert_rows(
+        metadata, table_name, table_data, [values], indexes
+    )
+    return table_data, new_ids[0]
 
-    existing_ids = [
-        row.get("ID")
-        for row in table_data
-        if isinstance(row.get("ID"), int)
-    ]
-    new_id = (max(existing_ids) + 1) if existing_ids else 1
 
-    row = {"ID": new_id}
-    for col_def, value in zip(schema[1:], values, strict=True):
-        col_name = col_def["name"]
-        col_type = col_def["type"]
-        row[col_name] = _validate_value(col_type, value)
+@handle_db_errors
+@log_time
+def insert_many(
+    metadata: dict,
+    table_name: str,
+    table_data: dict,
+    values_list: list,
+    indexes: dict | None = None,
+) -> tuple:
+    """
+    Добавление нескольких записей в таблицу за один вызов
+    Счетчик следующего ID (next_id) обновляется в метаданных на месте
 
-    table_data.append(row)
-    return table_data, new_id
+    :param metadata: Метаданные бд
+    :param table_name: Название таблицы
+    :param table_data: Данные таблицы (словарь колонок)
+    :param values_list: Список наборов значений (без ID)
+    :param indexes: Индексы таблицы, обновляются на месте (опционально)
+    :return: tuple: (Обновленные данные, список новых ID)
+    :raises: TableDoesNotExistError: Если таблицы не существует
+    :raises: InvalidValueError: Если количество значений или типы некорректны
+    """
+    return _insert_rows(metadata, table_name, table_data, values_list, indexes)
 
 
 @handle_db_errors
 @log_time
-def select(table_data: list, where_clause: dict | None = None) -> list:
+def select(
+    table_data: dict,
+    where_clause: dict | None = None,
+    indexes: dict | None = None,
+    columns: list | None = None,
+) -> Iterator[dict] | Iterator[tuple]:
     """
     Получение записей из таблицы
+    Поиск строк выполняется сразу, а записи собираются лениво:
+    результат можно прочитать только один раз
 
-    :param table_data: Данные таблицы
+    :param table_data: Данные таблицы (словарь колонок)
     :param where_clause: Условие where (опционально)
-    :return: list: Список записей
+    :param indexes: Индексы таблицы (опционально)
+    :param columns: Имена колонок (опционально); если заданы, вместо
+        словарей возвращаются кортежи значений этих колонок
+    :return: Iterator[dict] | Iterator[tuple]: Записи
     :raises: InvalidValueError: Если where некорректен
     """
     if where_clause is None or where_clause == {}:
-        return list(table_data)
+        if columns is not None:
+            return _column_values(table_data, columns)
+        names = list(table_data)
+        return (dict(zip(names, values)) for values in zip(*table_data.values()))
 
-    if not isinstance(where_clause, dict) or len(where_clause) != 1:
-        raise InvalidValueError("<where>")
+    find_rows = _where_predicate(where_clause)
+
+    if not _row_count(table_data):
+        return iter(())
 
-    (key, value), = where_clause.items()
-    return [row for row in table_data if row.get(key) == value]
+    idx = find_rows(table_data, indexes)
+    if columns is not None:
+        return _column_values(table_data, columns, idx)
+    return _materialize_rows(table_data, idx)
 
 
 @handle_db_errors
 def update(
     metadata: dict,
     table_name: str,
-    table_data: list,
+    table_data: dict,
     set_clause: dict,
     where_clause: dict,
+    indexes: dict | None = None,
 ) -> tuple:
     """
     Обновление записей по условию
 
     :param metadata: Метаданные бд
     :param table_name: Название таблицы
-    :param table_data: Данные таблицы
+    :param table_data: Данные таблицы (словарь колонок)
     :param set_clause: Данные для обновления
     :param where_clause: Условие where
+    :param indexes: Индексы таблицы, обновляются на месте (опционально)
     :return: tuple: (Обновленные данные, количество обновленных записей)
     :raises: TableDoesNotExistError: Если таблицы не существует
     :raises: InvalidValueError: Если колонка или значение некорректны
@@ -267,60 +592,90 @@ def update(
     if not isinstance(set_clause, dict) or not set_clause:
         raise InvalidValueError("<set>")
 
-    if not isinstance(where_clause, dict) or len(where_clause) != 1:
-        raise InvalidValueError("<where>")
+    find_rows = _where_predicate(where_clause)
 
     if "ID" in set_clause:
         raise InvalidValueError("ID")
 
-    (w_key, w_val), = where_clause.items()
+    unknown = set_clause.keys() - types_map.keys()
+    if unknown:
+        raise InvalidValueError(", ".join(sorted(unknown)))
 
-    updated = 0
-    for row in table_data:
-        if row.get(w_key) == w_val:
-            for key, val in set_clause.items():
-                if key not in types_map:
-                    raise InvalidValueError(key)
-                row[key] = _validate_value(types_map[key], val)
-            updated += 1
+    validated_set = {
+        key: _validate_value(types_map[key], val)
+        for key, val in set_clause.items()
+    }
 
-    return table_data, updated
+    if not _row_count(table_data):
+        return table_data, 0
+
+    idx = find_rows(table_data, indexes)
+    if not idx:
+        return table_data, 0
+
+    for key, val in validated_set.items():
+        column = table_data[key]
+        index = indexes.get(key) if indexes is not None else None
+        if index is not None:
+            move_rows(index, idx, list(map(column.__getitem__, idx)), val)
+        for i in idx:
+            column[i] = val
+
+    return table_data, len(idx)
 
 
 @handle_db_errors
 @confirm_action("удаление записи")
-def delete(table_data: list, where_clause: dict) -> tuple:
+def delete(
+    table_data: dict, where_clause: dict, indexes: dict | None = None
+) -> tuple:
     """
     Удаление записей по условию
+    Номера строк сдвигаются, поэтому индексы сбрасываются на месте
+    и строятся заново при следующем поиске
 
-    :param table_data: Данные таблицы
+    :param table_data: Данные таблицы (словарь колонок)
     :param where_clause: Условие where
+    :param indexes: Индексы таблицы (опционально)
     :return: tuple: (Обновленные данные, количество удаленных записей)
     :raises: InvalidValueError: Если where некорректен
     """
-    if not isinstance(where_clause, dict) or len(where_clause) != 1:
-        raise InvalidValueError("<where>")
+    find_rows = _where_predicate(where_clause)
+
+    idx = find_rows(table_data, indexes)
+    if not idx:
+        return table_data, 0
+
+    keep = [True] * _row_count(table_data)
+    for i in idx:
+        keep[i] = False
+    deleted = len(idx)
 
-    (key, value), = where_clause.items()
+    new_data = {
+        name: list(compress(values, keep))
+        for name, values in table_data.items()
+    }
 
-    before = len(table_data)
-    new_data = [row for row in table_data if row.get(key) != value]
-    deleted = before - len(new_data)
+    if indexes is not None:
+        indexes.clear()
 
     return new_data, deleted
 
 
 @handle_db_errors
-def info(metadata: dict, table_name: str, table_data: list) -> dict:
+def info(metadata: dict, table_name: str, table_data: dict) -> dict:
     """
     Получение информации о таблице
 
     :param metadata: Метаданные бд
     :param table_name: Название таблицы
-    :param table_data: Данные таблицы
+    :param table_data: Данные таблицы (словарь колонок)
     :return: dict: Информация о таблице (имя, столбцы, количество записей)
     :raises: TableDoesNotExistError: Если таблицы не существует
     """
     schema = _get_schema(metadata, table_name)
-    cols_str = ", ".join([f'{c["name"]}:{c["type"]}' for c in schema])
-    return {"table": table_name, "columns": cols_str, "count": len(table_data)}
+    return {
+        "table": table_name,
+        "columns": format_columns(schema),
+        "count": _row_count(table_data),
+    }
@@ -1,8 +1,12 @@
+import os
 import time
+from collections import OrderedDict
 from functools import wraps
 
 import prompt
 
+_LOG_TIME_ENABLED = os.environ.get("PRIMITIVE_DB_LOG_TIME", "1") != "0"
+
 
 class OperationCancelledError(Exception):
     """
@@ -79,7 +83,8 @@ def log_time(func):
     """
     Замер времени выполнения функции.
 
-    Выводит: Функция <имя> выполнилась за X.XXX секунд.
+    Выводит: Функция <имя> выполнилась за X.XXX мс.
+    Вывод отключается переменной окружения PRIMITIVE_DB_LOG_TIME=0.
 
     :param func: оборачиваемая функция
     :return: обертка
@@ -87,34 +92,40 @@ def log_time(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.monotonic()
+        start = time.perf_counter_ns()
         result = func(*args, **kwargs)
-        elapsed = time.monotonic() - start
+        elapsed_ms = (time.perf_counter_ns() - start) / 1e6
 
-        if result is not None:
-            print(f"Функция {func.__name__} выполнилась за {elapsed:.3f} секунд.")
+        if _LOG_TIME_ENABLED:
+            print(f"Функция {func.__name__} выполнилась за {elapsed_ms:.3f} мс.")
 
         return result
 
     return wrapper
 
 
-def create_cacher():
+def create_cacher(maxsize: int = 128):
     """
     Создает кэшер на основе замыкания.
 
     Внутренняя функция cache_result(key, value_func) возвращает значение по ключу
     из кэша или вычисляет его через value_func, сохраняет и возвращает.
+    Кэш ограничен maxsize записями: при переполнении вытесняется
+    давно не использовавшийся ключ (LRU).
 
+    :param maxsize: максимальное количество записей в кэше
     :return: функция cache_result(key, value_func)
     """
-    cache = {}
+    cache = OrderedDict()
 
     def cache_result(key, value_func):
         if key in cache:
+            cache.move_to_end(key)
             return cache[key]
         value = value_func()
         cache[key] = value
+        if len(cache) > maxsize:
+            cache.popitem(last=False)
         return value
 
     return cache_result
@@ -1,26 +1,53 @@
-import os
 import re
-import shlex
+from collections.abc import Iterable
 
 import prompt
 from prettytable import PrettyTable
 
-from .constants import METADATA_PATH, TABLE_FILE_TEMPLATE
+from .constants import METADATA_PATH
 from .core import (
     create_table,
     delete,
     drop_table,
+    format_columns,
     info,
     insert,
     list_tables,
     select,
     update,
 )
-from .decorators import create_cacher
+from .decorators import create_cacher, handle_db_errors
 from .parser import parse_set, parse_values, parse_where
-from .utils import load_metadata, load_table_data, save_metadata, save_table_data
+from .utils import (
+    append_table_row,
+    delete_table_data,
+    init_data_dir,
+    load_metadata,
+    load_table_data,
+    save_metadata,
+    save_table_data,
+)
 
 _CACHE_SELECT = create_cacher()
+_CACHE_WHERE = create_cacher()
+_TABLE_VERSIONS: dict[str, int] = {}
+_TABLE_CACHE: dict[str, tuple[dict, dict]] = {}
+_HEADERS_CACHE: dict[str, tuple[list, tuple]] = {}
+
+_COMMAND_RE = re.compile(
+    r"""
+    (?P<insert>insert\s+into\s+(?P<insert_table>\w+)
+        \s+values\s*\((?P<insert_values>.*)\)\s*)
+    | (?P<select>select\s+from\s+(?P<select_table>\w+)
+        (?:\s+where\s+(?P<select_where>.+))?\s*)
+    | (?P<update>update\s+(?P<update_table>\w+)
+        \s+set\s+(?P<update_set>.+?)\s+where\s+(?P<update_where>.+)\s*)
+    | (?P<delete>delete\s+from\s+(?P<delete_table>\w+)
+        \s+where\s+(?P<delete_where>.+)\s*)
+    | (?P<info>info\s+(?P<info_table>\w+)\s*)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
 
 
 def print_help() -> None:
@@ -36,7 +63,7 @@ def print_help() -> None:
     print("<command> drop_table <таблица> - удалить таблицу")
     print("<command> insert into <таблица> values (...) - добавить запись")
     print("<command> select from <таблица> - вывести все записи")
-    print("<command> select from <таблица> where a = b - фильтрация")
+    print("<command> select from <таблица> where a = b [and c = d] - фильтрация")
     print("<command> update <таблица> set a = b where c = d - обновить")
     print("<command> delete from <таблица> where a = b - удалить")
     print("<command> info <таблица> - информация о таблице")
@@ -44,240 +71,435 @@ def print_help() -> None:
     print("<command> help - справка\n")
 
 
-def _render_table(schema: list, rows: list) -> None:
+def _metadata_for(table: str) -> dict | None:
+    """
+    Метаданные бд для команды над существующей таблицей.
+
+    :param table: название таблицы
+    :return: метаданные бд или None, если таблицы нет (с выводом ошибки)
+    """
+    metadata = load_metadata(METADATA_PATH)
+    if table not in metadata:
+        print(f'Ошибка: Таблица "{table}" не существует.')
+        return None
+    return metadata
+
+
+@handle_db_errors
+def _parse_where(where_raw: str) -> dict | None:
+    """
+    Разбор where-условия с кэшированием по исходной строке.
+
+    :param where_raw: строка после where
+    :return: dict условия или None, если условие некорректно
+        (с выводом ошибки)
+    """
+    return _CACHE_WHERE(where_raw, lambda: parse_where(where_raw))
+
+
+@handle_db_errors
+def _parse_set(set_raw: str) -> dict | None:
+    """
+    Разбор set-выражения.
+
+    :param set_raw: строка после set
+    :return: dict изменений или None, если выражение некорректно
+        (с выводом ошибки)
+    """
+    return parse_set(set_raw)
+
+
+def _bump_version(table: str) -> None:
     """
-    Печать выборки в формате PrettyTable.
+    Увеличение версии таблицы после изменения ее данных.
+
+    Версия входит в ключ кэша select, поэтому старые выборки
+    перестают использоваться без обращения к файловой системе.
 
-    :param schema: схема таблицы (список колонок)
-    :param rows: строки (список словарей)
+    :param table: название таблицы
     :return: None
     """
-    headers = [c["name"] for c in schema]
+    _TABLE_VERSIONS[table] = _TABLE_VERSIONS.get(table, 0) + 1
+
+
+def _headers_for(metadata: dict, table: str) -> tuple:
+    """
+    Имена колонок таблицы из кэша процесса.
+
+    Кэш хранится отдельно от метаданных (в файл не попадает) и
+    запоминает список колонок, по которому построен. После создания
+    таблицы или перечитывания метаданных это уже другой список,
+    поэтому имена строятся заново.
+
+    :param metadata: метаданные бд
+    :param table: название таблицы
+    :return: кортеж имен колонок в порядке схемы
+    """
+    columns = metadata[table].get("columns") or []
+    cached = _HEADERS_CACHE.get(table)
+    if cached is None or cached[0] is not columns:
+        cached = (columns, tuple(c["name"] for c in columns))
+        _HEADERS_CACHE[table] = cached
+    return cached[1]
+
+
+def _load_table(metadata: dict, table: str) -> tuple[dict, dict]:
+    """
+    Данные таблицы и ее хеш-индексы из кэша процесса.
+
+    При первом обращении данные читаются с диска по колонкам из схемы.
+    Индексы колонок строятся лениво при первом поиске по колонке
+    (indexes.get_index). Дальше обработчики команд изменяют
+    закэшированные данные и индексы на месте.
+
+    :param metadata: метаданные бд
+    :param table: название таблицы
+    :return: (данные таблицы (словарь колонок), индексы)
+    """
+    if table not in metadata:
+        return {}, {}
+
+    cached = _TABLE_CACHE.get(table)
+    if cached is None:
+        table_data = load_table_data(table, _headers_for(metadata, table))
+        cached = (table_data, {})
+        _TABLE_CACHE[table] = cached
+
+    return cached
+
+
+def _render_table(headers: tuple, rows: Iterable[tuple]) -> str:
+    """
+    Форматирование выборки в виде PrettyTable.
+
+    Строки добавляются одним вызовом add_rows.
+
+    :param headers: имена колонок
+    :param rows: значения колонок построчно (итерируемое кортежей)
+    :return: текст таблицы
+    """
     pt = PrettyTable()
     pt.field_names = headers
+    pt.add_rows(list(rows))
 
-    for row in rows:
-        pt.add_row([row.get(h) for h in headers])
+    return pt.get_string()
 
-    print(pt)
 
+def _do_insert(m: re.Match) -> None:
+    """
+    Обработка команды insert into <таблица> values (...).
 
-def run() -> None:
+    :param m: результат сопоставления с _COMMAND_RE (ветка insert)
+    :return: None
     """
-    Главный цикл CLI базы данных.
+    table = m.group("insert_table")
+    values_inner = m.group("insert_values")
+
+    metadata = load_metadata(METADATA_PATH)
+    table_data, indexes = _load_table(metadata, table)
+    values = parse_values(values_inner)
+
+    result = insert(metadata, table, table_data, values, indexes)
+    if result is None:
+        return
+
+    table_data, new_id = result
+    save_metadata(METADATA_PATH, metadata)
+    append_table_row(table, {name: col[-1] for name, col in table_data.items()})
+    _bump_version(table)
+    print(f'Запись с ID={new_id} успешно добавлена в таблицу "{table}".')
+
+
+def _do_select(m: re.Match) -> None:
+    """
+    Обработка команды select from <таблица> [where ...].
 
+    :param m: результат сопоставления с _COMMAND_RE (ветка select)
     :return: None
     """
-    print_help()
+    table = m.group("select_table")
+    where_raw = m.group("select_where")
 
-    while True:
-        user_input = prompt.string("Введите команду: ").strip()
-        if not user_input:
-            continue
+    metadata = _metadata_for(table)
+    if metadata is None:
+        return
 
-        raw = user_input.strip()
+    table_data, indexes = _load_table(metadata, table)
+    where_clause = None
+    if where_raw:
+        where_clause = _parse_where(where_raw)
+        if where_clause is None:
+            return
 
-        m = re.fullmatch(
-            r"insert\s+into\s+(\w+)\s+values\s*\((.*)\)\s*",
-            raw,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            table = m.group(1)
-            values_inner = m.group(2)
+    headers = _headers_for(metadata, table)
+    key = (table, where_raw or "", _TABLE_VERSIONS.get(table, 0))
 
-            metadata = load_metadata(METADATA_PATH)
-            table_data = load_table_data(table)
-            values = parse_values(values_inner)
+    def render() -> str | None:
+        rows = select(table_data, where_clause, indexes, headers)
+        return None if rows is None else _render_table(headers, rows)
 
-            result = insert(metadata, table, table_data, values)
-            if result is None:
-                continue
+    output = _CACHE_SELECT(key, render)
+    if output is None:
+        return
+
+    print(output)
 
-            table_data, new_id = result
-            save_table_data(table, table_data)
-            print(f'Запись с ID={new_id} успешно добавлена в таблицу "{table}".')
-            continue
 
-        m = re.fullmatch(
-            r"select\s+from\s+(\w+)(?:\s+where\s+(.+))?\s*",
-            raw,
-            flags=re.IGNORECASE,
+def _do_update(m: re.Match) -> None:
+    """
+    Обработка команды update <таблица> set ... where ....
+
+    :param m: результат сопоставления с _COMMAND_RE (ветка update)
+    :return: None
+    """
+    table = m.group("update_table")
+    set_raw = m.group("update_set")
+    where_raw = m.group("update_where")
+
+    metadata = _metadata_for(table)
+    if metadata is None:
+        return
+
+    table_data, indexes = _load_table(metadata, table)
+    set_clause = _parse_set(set_raw)
+    if set_clause is None:
+        return
+    where_clause = _parse_where(where_raw)
+    if where_clause is None:
+        return
+
+    result = update(
+        metadata, table, table_data, set_clause, where_clause, indexes
+    )
+    if result is None:
+        return
+
+    table_data, updated = result
+    save_table_data(table, table_data)
+    _bump_version(table)
+
+    if updated == 0:
+        print("Ничего не обновлено (нет подходящих записей).")
+    else:
+        msg = (
+            f'Записи в таблице "{table}" успешно обновлены. '
+            f"Изменено: {updated}."
         )
-        if m:
-            table = m.group(1)
-            where_raw = m.group(2)
+        print(msg)
+
+
+def _do_delete(m: re.Match) -> None:
+    """
+    Обработка команды delete from <таблица> where ....
 
-            metadata = load_metadata(METADATA_PATH)
-            if table not in metadata:
-                print(f'Ошибка: Таблица "{table}" не существует.')
-                continue
+    :param m: результат сопоставления с _COMMAND_RE (ветка delete)
+    :return: None
+    """
+    table = m.group("delete_table")
+    where_raw = m.group("delete_where")
 
-            table_data = load_table_data(table)
-            where_clause = parse_where(where_raw) if where_raw else None
+    metadata = _metadata_for(table)
+    if metadata is None:
+        return
 
-            filepath = TABLE_FILE_TEMPLATE.format(table=table)
-            mtime = os.path.getmtime(filepath) if os.path.exists(filepath) else 0.0
-            key = (table, where_raw or "", mtime)
+    table_data, indexes = _load_table(metadata, table)
+    where_clause = _parse_where(where_raw)
+    if where_clause is None:
+        return
 
-            rows = _CACHE_SELECT(key, lambda: select(table_data, where_clause))
-            if rows is None:
-                continue
+    result = delete(table_data, where_clause, indexes)
+    if result is None:
+        return
 
-            schema = metadata[table]["columns"]
-            _render_table(schema, rows)
-            continue
+    table_data, deleted = result
+    _TABLE_CACHE[table] = (table_data, indexes)
+    save_table_data(table, table_data)
+    _bump_version(table)
+    print(f"Удалено записей: {deleted}.")
 
-        m = re.fullmatch(
-            r"update\s+(\w+)\s+set\s+(.+?)\s+where\s+(.+)\s*",
-            raw,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            table = m.group(1)
-            set_raw = m.group(2)
-            where_raw = m.group(3)
-
-            metadata = load_metadata(METADATA_PATH)
-            if table not in metadata:
-                print(f'Ошибка: Таблица "{table}" не существует.')
-                continue
-
-            table_data = load_table_data(table)
-            set_clause = parse_set(set_raw)
-            where_clause = parse_where(where_raw)
-
-            result = update(metadata, table, table_data, set_clause, where_clause)
-            if result is None:
-                continue
-
-            table_data, updated = result
-            save_table_data(table, table_data)
-
-            if updated == 0:
-                print("Ничего не обновлено (нет подходящих записей).")
-            else:
-                msg = (
-                    f'Записи в таблице "{table}" успешно обновлены. '
-                    f"Изменено: {updated}."
-                )
-                print(msg)
-            continue
 
-        m = re.fullmatch(
-            r"delete\s+from\s+(\w+)\s+where\s+(.+)\s*",
-            raw,
-            flags=re.IGNORECASE,
-        )
-        if m:
-            table = m.group(1)
-            where_raw = m.group(2)
+def _do_info(m: re.Match) -> None:
+    """
+    Обработка команды info <таблица>.
 
-            metadata = load_metadata(METADATA_PATH)
-            if table not in metadata:
-                print(f'Ошибка: Таблица "{table}" не существует.')
-                continue
+    :param m: результат сопоставления с _COMMAND_RE (ветка info)
+    :return: None
+    """
+    table = m.group("info_table")
 
-            table_data = load_table_data(table)
-            where_clause = parse_where(where_raw)
+    metadata = _metadata_for(table)
+    if metadata is None:
+        return
 
-            result = delete(table_data, where_clause)
-            if result is None:
-                continue
+    table_data, _ = _load_table(metadata, table)
+    res = info(metadata, table, table_data)
+    if res is None:
+        return
 
-            table_data, deleted = result
-            save_table_data(table, table_data)
-            print(f"Удалено записей: {deleted}.")
-            continue
+    print(f'Таблица: {res["table"]}')
+    print(f'Столбцы: {res["columns"]}')
+    print(f'Количество записей: {res["count"]}')
 
-        m = re.fullmatch(r"info\s+(\w+)\s*", raw, flags=re.IGNORECASE)
-        if m:
-            table = m.group(1)
 
-            metadata = load_metadata(METADATA_PATH)
-            if table not in metadata:
-                print(f'Ошибка: Таблица "{table}" не существует.')
-                continue
+_DISPATCH = {
+    "insert": _do_insert,
+    "select": _do_select,
+    "update": _do_update,
+    "delete": _do_delete,
+    "info": _do_info,
+}
 
-            table_data = load_table_data(table)
-            res = info(metadata, table, table_data)
-            if res is None:
-                continue
 
-            print(f'Таблица: {res["table"]}')
-            print(f'Столбцы: {res["columns"]}')
-            print(f'Количество записей: {res["count"]}')
-            continue
+def _dispatch_query(raw: str) -> bool:
+    """
+    Выполнение команды, распознанной общим регулярным выражением.
 
-        try:
-            args = shlex.split(user_input)
-        except ValueError:
-            print("Некорректное значение <input>. Попробуйте снова.")
-            continue
+    Все команды сопоставляются одним вызовом _COMMAND_RE.fullmatch;
+    ветка определяется по имени внешней группы (m.lastgroup).
 
-        if not args:
-            continue
+    :param raw: введенная строка
+    :return: True, если команда распознана и обработана
+    """
+    m = _COMMAND_RE.fullmatch(raw)
+    if m is None:
+        return False
 
-        command = args[0]
-        cmd_args = args[1:]
-        metadata = load_metadata(METADATA_PATH)
+    _DISPATCH[m.lastgroup](m)
+    return True
 
-        match command:
-            case "help":
-                print_help()
 
-            case "exit":
-                return
+def _cmd_help(cmd_args: list, metadata: dict) -> None:
+    """
+    Обработка команды help.
+
+    :param cmd_args: аргументы команды
+    :param metadata: метаданные бд
+    :return: None
+    """
+    print_help()
+
+
+def _cmd_exit(cmd_args: list, metadata: dict) -> bool:
+    """
+    Обработка команды exit.
+
+    :param cmd_args: аргументы команды
+    :param metadata: метаданные бд
+    :return: True (завершить главный цикл)
+    """
+    return True
 
-            case "list_tables":
-                tables = list_tables(metadata)
-                if tables is None:
-                    continue
-                if not tables:
-                    print("- (нет таблиц)")
-                else:
-                    for t in tables:
-                        print(f"- {t}")
 
-            case "create_table":
-                if len(cmd_args) < 2:
-                    print("Некорректное значение: <args>. Попробуйте снова.")
-                    continue
+def _cmd_list_tables(cmd_args: list, metadata: dict) -> None:
+    """
+    Обработка команды list_tables.
 
-                table_name = cmd_args[0]
-                columns = cmd_args[1:]
+    :param cmd_args: аргументы команды
+    :param metadata: метаданные бд
+    :return: None
+    """
+    tables = list_tables(metadata)
+    if tables is None:
+        return
+    if not tables:
+        print("- (нет таблиц)")
+    else:
+        for t in tables:
+            print(f"- {t}")
 
-                new_metadata = create_table(metadata, table_name, columns)
-                if new_metadata is None:
-                    continue
 
-                save_metadata(METADATA_PATH, new_metadata)
-                cols = new_metadata[table_name]["columns"]
-                cols_text = ", ".join([f'{c["name"]}:{c["type"]}' for c in cols])
+def _cmd_create_table(cmd_args: list, metadata: dict) -> None:
+    """
+    Обработка команды create_table <таблица> <столбец:тип> ....
 
-                print(
-                    f'Таблица "{table_name}" успешно создана со столбцами: '
-                    f"{cols_text}"
-                )
+    :param cmd_args: аргументы команды
+    :param metadata: метаданные бд
+    :return: None
+    """
+    if len(cmd_args) < 2:
+        print("Некорректное значение: <args>. Попробуйте снова.")
+        return
 
-            case "drop_table":
-                if len(cmd_args) != 1:
-                    print("Некорректное значение: <args>. Попробуйте снова.")
-                    continue
+    table_name = cmd_args[0]
+    columns = cmd_args[1:]
 
-                table_name = cmd_args[0]
+    new_metadata = create_table(metadata, table_name, columns)
+    if new_metadata is None:
+        return
 
-                new_metadata = drop_table(metadata, table_name)
-                if new_metadata is None:
-                    continue
+    save_metadata(METADATA_PATH, new_metadata)
+    cols_text = format_columns(new_metadata[table_name]["columns"])
 
-                save_metadata(METADATA_PATH, new_metadata)
+    print(
+        f'Таблица "{table_name}" успешно создана со столбцами: '
+        f"{cols_text}"
+    )
 
-                filepath = TABLE_FILE_TEMPLATE.format(table=table_name)
-                if os.path.exists(filepath):
-                    os.remove(filepath)
 
-                print(f'Таблица "{table_name}" успешно удалена.')
+def _cmd_drop_table(cmd_args: list, metadata: dict) -> None:
+    """
+    Обработка команды drop_table <таблица>.
+
+    :param cmd_args: аргументы команды
+    :param metadata: метаданные бд
+    :return: None
+    """
+    if len(cmd_args) != 1:
+        print("Некорректное значение: <args>. Попробуйте снова.")
+        return
+
+    table_name = cmd_args[0]
+
+    new_metadata = drop_table(metadata, table_name)
+    if new_metadata is None:
+        return
+
+    save_metadata(METADATA_PATH, new_metadata)
+
+    delete_table_data(table_name)
+    _TABLE_CACHE.pop(table_name, None)
+    _HEADERS_CACHE.pop(table_name, None)
+    _bump_version(table_name)
+
+    print(f'Таблица "{table_name}" успешно удалена.')
+
+
+# Обработчики команд, не распознаваемых _COMMAND_RE.
+# Обработчик получает (аргументы, метаданные); истинный результат
+# завершает главный цикл.
+_COMMANDS = {
+    "help": _cmd_help,
+    "exit": _cmd_exit,
+    "list_tables": _cmd_list_tables,
+    "create_table": _cmd_create_table,
+    "drop_table": _cmd_drop_table,
+}
+
+
+def run() -> None:
+    """
+    Главный цикл CLI базы данных.
+
+    :return: None
+    """
+    init_data_dir()
+    print_help()
+
+    while True:
+        user_input = prompt.string("Введите команду: ").strip()
+        if not user_input:
+            continue
+
+        if _dispatch_query(user_input):
+            continue
+
+        args = user_input.split()
+        command = args[0]
+
+        handler = _COMMANDS.get(command)
+        if handler is None:
+            print(f"Функции {command} нет. Попробуйте снова.")
+            continue
 
-            case _:
-                print(f"Функции {command} нет. Попробуйте снова.")
+        if handler(args[1:], load_metadata(METADATA_PATH)):
+            return
@@ -0,0 +1,93 @@
+from itertools import compress, filterfalse
+from operator import not_
+
+from .constants import RESERVED_ID_COLUMN
+
+
+def _build_index(name: str, column: list) -> dict:
+    """
+    Построение хеш-индекса одной колонки
+
+    Для типовых случаев используются быстрые пути без Python-цикла
+    с setdefault: колонка bool раскладывается двумя масками compress,
+    а уникальная колонка ID собирается одним dict comprehension.
+
+    :param name: Название колонки
+    :param column: Значения колонки
+    :return: dict: Индекс {значение: [номера строк]}
+    """
+    rows = range(len(column))
+
+    if column and set(map(type, column)) == {bool}:
+        index = {
+            True: list(compress(rows, column)),
+            False: list(compress(rows, map(not_, column))),
+        }
+        return {value: idx for value, idx in index.items() if idx}
+
+    if name == RESERVED_ID_COLUMN:
+        index = {value: [i] for i, value in enumerate(column)}
+        if len(index) == len(column):
+            return index
+
+    index = {}
+    for i, value in enumerate(column):
+        index.setdefault(value, []).append(i)
+    return index
+
+
+def get_index(indexes: dict, table_data: dict, column: str) -> dict | None:
+    """
+    Хеш-индекс колонки, построенный при первом обращении
+
+    Индексы таблицы хранятся в словаре indexes {колонка: индекс}.
+    Индекс колонки строится, только когда по ней впервые ищут строки,
+    и дальше поддерживается на месте при insert/update; delete
+    сбрасывает все индексы таблицы (indexes.clear()).
+
+    :param indexes: Индексы таблицы {колонка: {значение: [номера строк]}}
+    :param table_data: Данные таблицы (словарь колонок)
+    :param column: Название колонки
+    :return: dict | None: Индекс колонки или None, если колонки нет
+    """
+    index = indexes.get(column)
+    if index is None:
+        values = table_data.get(column)
+        if values is None:
+            return None
+        index = indexes[column] = _build_index(column, values)
+    return index
+
+
+def move_rows(index: dict, rows: list, old_values: list, new: object) -> None:
+    """
+    Перенос строк в индексе колонки со старых значений на новое
+
+    Работа ведется по колонке целиком, а не по строке: списки строк
+    старых значений пересобираются одним проходом filterfalse, а
+    перенесенные строки сливаются с целевым списком одной сортировкой.
+
+    :param index: Индекс колонки {значение: [номера строк]}
+    :param rows: Номера изменяемых строк
+    :param old_values: Старые значения колонки в этих строках
+    :param new: Новое значение
+    :return: None
+    """
+    moved_by_old: dict = {}
+    for row, old in zip(rows, old_values, strict=True):
+        if old != new:
+            moved_by_old.setdefault(old, []).append(row)
+
+    if not moved_by_old:
+        return
+
+    moved = []
+    for old, old_rows in moved_by_old.items():
+        remaining = list(filterfalse(set(old_rows).__contains__, index[old]))
+        if remaining:
+            index[old] = remaining
+        else:
+            del index[old]
+        moved.extend(old_rows)
+
+    index[new] = sorted(index.get(new, []) + moved)
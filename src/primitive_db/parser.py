@@ -1,47 +1,61 @@
 import re
+from functools import lru_cache
+
+# Строка в кавычках: внутри допустимы \x и "", незакрытая кавычка
+# продолжается до конца строки.
+_QUOTED = r'"(?:[^"\\]++|\\.|""|\\\Z)*+(?:"|\Z)'
+# Строка в кавычках либо разделитель ',' или '='.
+_TOKEN_RE = re.compile(_QUOTED + r"|,|=", re.DOTALL)
+_UNESCAPE_RE = re.compile(r'\\(.)|""', re.DOTALL)
+# Строка в кавычках (пропускается) либо ключевое слово AND.
+_AND_RE = re.compile(_QUOTED + r"|\s+and\s+", re.IGNORECASE | re.DOTALL)
+
+
+def _unescape(m: re.Match) -> str:
+    """
+    Замена для _UNESCAPE_RE: '\\x' -> 'x', '""' -> '"'.
+
+    :param m: совпадение _UNESCAPE_RE
+    :return: символ без экранирования
+    """
+    return m.group(1) or '"'
 
 
 def _split_commas(text: str) -> list[str]:
     """
     Разбивает строку по запятым, игнорируя запятые внутри кавычек.
 
+    Строка без кавычек делится str.split. Иначе строки в кавычках
+    и разделители находит _TOKEN_RE.finditer, а текст между ними
+    копируется срезами без посимвольного цикла.
+
     :param text: исходная строка
     :return: список частей
     """
+    if '"' not in text:
+        return text.split(",")
+
     parts: list[str] = []
     buf: list[str] = []
-    in_quotes = False
-    i = 0
-
-    while i < len(text):
-        ch = text[i]
+    start = 0
 
-        if in_quotes and ch == "\\" and i + 1 < len(text):
-            buf.append(text[i + 1])
-            i += 2
+    for m in _TOKEN_RE.finditer(text):
+        token = m.group()
+        if token == "=":
             continue
 
-        if ch == '"':
+        buf.append(text[start : m.start()])
+        start = m.end()
 
-            if in_quotes and i + 1 < len(text) and text[i + 1] == '"':
-                buf.append('"')
-                i += 2
-                continue
-
-            in_quotes = not in_quotes
-            buf.append(ch)
-            i += 1
-            continue
-
-        if ch == "," and not in_quotes:
+        if token == ",":
             parts.append("".join(buf))
             buf = []
-            i += 1
-            continue
-
-        buf.append(ch)
-        i += 1
+        elif "\\" in token or '""' in token[1:]:
+            buf.append('"' + _UNESCAPE_RE.sub(_unescape, token[1:]))
+        else:
+            buf.append(token)
 
+    buf.append(text[start:])
     parts.append("".join(buf))
     return parts
 
@@ -55,31 +69,17 @@ def _split_one_equals(part: str) -> tuple[str, str]:
     :return: (key, value)
     :raises ValueError: если формат некорректный
     """
-    in_quotes = False
     eq_pos: int | None = None
 
-    i = 0
-    while i < len(part):
-        ch = part[i]
-
-        if in_quotes and ch == "\\" and i + 1 < len(part):
-            i += 2
-            continue
-
-        if ch == '"':
-            if in_quotes and i + 1 < len(part) and part[i + 1] == '"':
-                i += 2
-                continue
-            in_quotes = not in_quotes
-            i += 1
-            continue
-
-        if ch == "=" and not in_quotes:
-            if eq_pos is None:
-                eq_pos = i
-            else:
-                raise ValueError(part)
-        i += 1
+    if '"' not in part:
+        if part.count("=") == 1:
+            eq_pos = part.index("=")
+    else:
+        for m in _TOKEN_RE.finditer(part):
+            if m.group() == "=":
+                if eq_pos is not None:
+                    raise ValueError(part)
+                eq_pos = m.start()
 
     if eq_pos is None:
         raise ValueError(part)
@@ -93,10 +93,12 @@ def _split_one_equals(part: str) -> tuple[str, str]:
     return key, val
 
 
+@lru_cache(maxsize=1024)
 def parse_scalar(raw: str):
     """
     Преобразует строку в int/bool/str.
     Важно: если значение в двойных кавычках - это строка (без конвертаций).
+    Результат кэшируется: повторяющиеся значения разбираются один раз.
 
     :param raw: исходное значение
     :return: преобразованное значение
@@ -112,7 +114,8 @@ def parse_scalar(raw: str):
     if low == "false":
         return False
 
-    if re.fullmatch(r"-?\d+", s):
+    digits = s[1:] if s[:1] == "-" else s
+    if digits.isdecimal():
         return int(s)
 
     return s
@@ -140,39 +143,125 @@ def parse_values(values_inner: str) -> list:
     return result
 
 
-def parse_assignments(assignments: str) -> dict:
+def _parse_pairs(assignments: str) -> list[tuple[str, object]]:
     """
-    Парсит присваивания вида 'a = 1, b = "x"' в словарь.
+    Парсит присваивания вида 'a = 1, b = "x"' в список пар.
+    Повторяющиеся поля сохраняются в порядке записи.
 
     :param assignments: строка присваиваний
-    :return: dict {поле: значение}
+    :return: list [(поле, значение)]
     :raises ValueError: если формат некорректен
     """
     if not assignments.strip():
         raise ValueError(assignments)
 
-    parts = _split_commas(assignments)
-    result: dict = {}
+    pairs: list[tuple[str, object]] = []
 
-    for raw_part in parts:
+    for raw_part in _split_commas(assignments):
         part = raw_part.strip()
         if part == "":
             raise ValueError(raw_part)
 
         key, val = _split_one_equals(part)
-        result[key] = parse_scalar(val)
+        pairs.append((key, parse_scalar(val)))
 
-    return result
+    return pairs
+
+
+def parse_assignments(assignments: str) -> dict:
+    """
+    Парсит присваивания вида 'a = 1, b = "x"' в словарь.
+
+    :param assignments: строка присваиваний
+    :return: dict {поле: значение}
+    :raises ValueError: если формат некорректен
+    """
+    return dict(_parse_pairs(assignments))
+
+
+class _NoMatch:
+    """
+    Значение условия, которому не равно ни одно значение колонки
+    """
+
+    __slots__ = ()
+
+    def __eq__(self, other: object) -> bool:
+        return False
+
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return "NO_MATCH"
+
+
+NO_MATCH = _NoMatch()
+
+
+def _has_equals(text: str) -> bool:
+    """
+    Проверяет, есть ли в строке '=' вне кавычек.
+
+    :param text: исходная строка
+    :return: True, если '=' есть
+    """
+    if '"' not in text:
+        return "=" in text
+    return any(m.group() == "=" for m in _TOKEN_RE.finditer(text))
+
+
+def _split_and(text: str) -> list[str]:
+    """
+    Разбивает строку по ключевому слову AND, игнорируя его внутри кавычек.
+
+    Часть без '=' не считается отдельным условием и вместе с AND
+    возвращается в значение предыдущего условия: 'name = rock and roll'
+    остается одним условием.
+
+    :param text: исходная строка
+    :return: список частей
+    """
+    pieces: list[tuple[str, str]] = []
+    start = 0
+    sep = ""
+
+    for m in _AND_RE.finditer(text):
+        if m.group().startswith('"'):
+            continue
+        pieces.append((sep, text[start : m.start()]))
+        sep = m.group()
+        start = m.end()
+    pieces.append((sep, text[start:]))
+
+    parts: list[str] = []
+    for sep, piece in pieces:
+        if parts and not _has_equals(piece):
+            parts[-1] += sep + piece
+        else:
+            parts.append(piece)
+    return parts
 
 
 def parse_where(where_part: str) -> dict:
     """
-    Парсит where-условие вида 'age = 28'.
+    Парсит where-условие вида 'age = 28' или 'age = 28 and name = "Bob"'.
+    Все условия (через AND или запятую) объединяются через AND.
+    Если колонка повторяется с другим значением, условию по ней
+    не подходит ни одна строка (значение NO_MATCH).
 
     :param where_part: строка после where
     :return: dict условия
+    :raises ValueError: если формат некорректен
     """
-    return parse_assignments(where_part)
+    result: dict = {}
+
+    for condition in _split_and(where_part):
+        for key, val in _parse_pairs(condition):
+            if key in result and result[key] != val:
+                val = NO_MATCH
+            result[key] = val
+
+    return result
 
 
 def parse_set(set_part: str) -> dict:
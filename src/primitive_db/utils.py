@@ -1,75 +1,303 @@
 import json
 import os
+import re
+from itertools import repeat
 from json import JSONDecodeError
 
-from .constants import DATA_DIR, TABLE_FILE_TEMPLATE
+from .constants import (
+    DATA_DIR,
+    LEGACY_TABLE_FILE_TEMPLATE,
+    METADATA_PATH,
+    TABLE_FILE_TEMPLATE,
+)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def _ensure_data_dir() -> None:
-    """Создает директорию data/, если ее нет."""
+_METADATA_CACHE: dict[str, tuple[tuple, dict]] = {}
+# Последовательность цифр, которая может не поместиться в 64 бита:
+# orjson прочитал бы такое число как float.
+_LONG_INT_RE = re.compile(rb"\d{19,}")
+
+
+def _loads(raw: bytes) -> object:
+    """
+    Разбор JSON из байтов (orjson, если установлен, иначе json).
+
+    orjson читает целые длиннее 64 бит как float, поэтому при наличии
+    в данных длинных последовательностей цифр используется json,
+    который сохраняет такие числа без потерь.
+
+    :param raw: содержимое файла
+    :return: разобранный объект
+    """
+    if orjson is not None and _LONG_INT_RE.search(raw) is None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps(data: object, indent: int | None = None) -> bytes:
+    """
+    Сериализация в JSON-байты (orjson, если установлен, иначе json).
+
+    orjson поддерживает только отступ в 2 пробела и не умеет
+    записывать целые длиннее 64 бит (они могли остаться в старых
+    данных) - для них используется json.
+    Без indent объект записывается в одну строку (для .jsonl).
+
+    :param data: сохраняемый объект
+    :param indent: отступ для стандартного json
+    :return: JSON в кодировке UTF-8
+    """
+    if orjson is not None:
+        try:
+            if indent is None:
+                return orjson.dumps(data)
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+
+
+def init_data_dir() -> None:
+    """
+    Создание директории data/, если ее нет.
+    Вызывается один раз при запуске (engine.run), а не при каждом
+    чтении или записи файлов.
+
+    :return: None
+    """
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
+def _write_atomic(filepath: str, payload: bytes) -> None:
+    """
+    Запись файла целиком через временный файл и os.replace.
+
+    Данные записываются одним вызовом write() во временный файл рядом
+    с целевым, который затем атомарно подменяет его: при сбое во время
+    записи старый файл остается целым.
+
+    :param filepath: путь к файлу
+    :param payload: содержимое файла
+    :return: None
+    """
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, filepath)
+
+
+def _file_signature(filepath: str) -> tuple | None:
+    """
+    Подпись файла для проверки актуальности кэша.
+
+    :param filepath: Путь к файлу
+    :return: (st_mtime_ns, st_size) или None, если файла нет
+    """
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def load_metadata(filepath: str) -> dict:
     """
     Загрузка файла метаданных БД
     Если файлов нет - возврат пустого словаря
 
+    Разобранные метаданные кэшируются по пути файла и перечитываются,
+    только если изменилась подпись файла (mtime_ns, size).
+
     :param filepath: Путь к метаданным
     :return: Словарь с метаданными
     """
-    _ensure_data_dir()
+    signature = _file_signature(filepath)
+    if signature is None:
+        return {}
+
+    cached = _METADATA_CACHE.get(filepath)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(filepath, "rb") as f:
+            data = _loads(f.read())
     except FileNotFoundError:
         return {}
     except JSONDecodeError:
-        return {}
+        data = {}
+
+    _METADATA_CACHE[filepath] = (signature, data)
+    return data
 
 
 def save_metadata(filepath: str, data: dict) -> None:
     """
     Сохранение метаданных БД в JSON файл
+    Кэш метаданных обновляется сохраненным объектом
 
     :param filepath: Путь к бд
     :param data: Словарь с сохраняемыми метаданными
     :return: None
     """
-    _ensure_data_dir()
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    _write_atomic(filepath, _dumps(data, indent=4))
+
+    _METADATA_CACHE[filepath] = (_file_signature(filepath), data)
+
+
+def _read_rows(filepath: str) -> list:
+    """
+    Чтение строк таблицы из файла .jsonl (одна запись на строку).
+
+    Байты файла превращаются в JSON-массив заменой переводов строк на
+    запятые и разбираются одним вызовом _loads (orjson, если установлен),
+    без декодирования в str и без списка отдельных строк.
+    Если это не удалось (пустые строки или недописанная последняя
+    строка после аварийного завершения), строки разбираются по одной,
+    пустые и поврежденные пропускаются, а файл сразу перезаписывается
+    только уцелевшими записями, чтобы следующая дозапись не склеилась
+    с обрывком строки.
+
+    :param filepath: путь к файлу таблицы
+    :return: список записей (словарей)
+    """
+    with open(filepath, "rb") as f:
+        raw = f.read().strip()
+
+    try:
+        rows = _loads(b"[" + raw.replace(b"\n", b",") + b"]")
+    except JSONDecodeError:
+        rows = []
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(_loads(line))
+            except JSONDecodeError:
+                continue
+        rows = [row for row in rows if isinstance(row, dict)]
+        _write_rows(filepath, rows)
+        return rows
+
+    return [row for row in rows if isinstance(row, dict)]
+
+
+def _write_rows(filepath: str, rows: list) -> None:
+    """
+    Полная перезапись файла таблицы в формате .jsonl.
+
+    :param filepath: путь к файлу таблицы
+    :param rows: список записей (словарей)
+    :return: None
+    """
+    _write_atomic(filepath, b"".join(_dumps(row) + b"\n" for row in rows))
 
 
-def load_table_data(table_name: str) -> list:
+def _migrate_legacy_table(table_name: str) -> list:
     """
-    Загрузка данных таблицы
+    Перенос данных таблицы из старого формата data/<table>.json.
+
+    Если старый файл есть, его записи сохраняются в .jsonl, а сам он
+    удаляется, чтобы последующие дозаписи не потеряли ранее
+    сохраненные строки.
 
     :param table_name: Имя таблицы
-    :return: Список записей
+    :return: список записей (пустой, если старого файла нет)
     """
-    _ensure_data_dir()
-    filepath = TABLE_FILE_TEMPLATE.format(table=table_name)
+    legacy_path = LEGACY_TABLE_FILE_TEMPLATE.format(table=table_name)
+    if legacy_path == METADATA_PATH:
+        return []
 
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data if isinstance(data, list) else []
-    except FileNotFoundError:
+        with open(legacy_path, "rb") as f:
+            rows = _loads(f.read())
+    except (FileNotFoundError, JSONDecodeError):
         return []
-    except JSONDecodeError:
+
+    if not isinstance(rows, list):
         return []
 
-def save_table_data(table_name: str, data: list) -> None:
+    rows = [row for row in rows if isinstance(row, dict)]
+    _write_rows(TABLE_FILE_TEMPLATE.format(table=table_name), rows)
+    os.remove(legacy_path)
+    return rows
+
+
+def load_table_data(table_name: str, columns: list) -> dict:
+    """
+    Загрузка данных таблицы в колоночном виде
+
+    Строки разворачиваются в колонки через map(dict.get, ...), так что
+    перебор строк для каждой колонки выполняется на уровне C.
+
+    :param table_name: Имя таблицы
+    :param columns: Имена колонок таблицы
+    :return: Словарь {колонка: список значений}
+    """
+    filepath = TABLE_FILE_TEMPLATE.format(table=table_name)
+
+    try:
+        rows = _read_rows(filepath)
+    except FileNotFoundError:
+        rows = _migrate_legacy_table(table_name)
+
+    return {name: list(map(dict.get, rows, repeat(name))) for name in columns}
+
+
+def save_table_data(table_name: str, data: dict) -> None:
     """
-    Сохранение данных таблицы
+    Сохранение данных таблицы (полная перезапись файла)
 
     :param table_name: Имя таблицы
-    :param data: Список записей
+    :param data: Словарь {колонка: список значений}
     :return: None
     """
-    _ensure_data_dir()
     filepath = TABLE_FILE_TEMPLATE.format(table=table_name)
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    names = list(data)
+    rows = [dict(zip(names, values)) for values in zip(*data.values())]
+    _write_rows(filepath, rows)
+
+
+def append_table_row(table_name: str, row: dict) -> None:
+    """
+    Дозапись одной строки в конец файла таблицы.
+
+    Стоимость не зависит от размера таблицы: файл не перечитывается
+    и не перезаписывается. Если файл не заканчивается переводом строки
+    (например, отредактирован вручную), запись начинается с новой
+    строки, чтобы не склеиться с последней.
+
+    :param table_name: Имя таблицы
+    :param row: Запись {колонка: значение}
+    :return: None
+    """
+    filepath = TABLE_FILE_TEMPLATE.format(table=table_name)
+    line = _dumps(row) + b"\n"
+
+    with open(filepath, "a+b") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = b"\n" + line
+        f.write(line)
+
+
+def delete_table_data(table_name: str) -> None:
+    """
+    Удаление файла данных таблицы (в том числе в старом формате .json).
+
+    :param table_name: Имя таблицы
+    :return: None
+    """
+    paths = [
+        TABLE_FILE_TEMPLATE.format(table=table_name),
+        LEGACY_TABLE_FILE_TEMPLATE.format(table=table_name),
+    ]
+    for filepath in paths:
+        if filepath != METADATA_PATH and os.path.exists(filepath):
+            os.remove(filepath)